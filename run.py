@@ -7,11 +7,26 @@ CLI runner for Wayback → WordPress importer
 
 import argparse
 import json
+from functools import lru_cache
 from pathlib import Path
 import sys
 
+try:
+    import uvloop  # faster libuv-based event loop (not available on Windows)
+except Exception:
+    uvloop = None
+
+try:
+    import orjson  # faster C JSON parser, optional
+except Exception:
+    orjson = None
+
 DEFAULT_CONFIG = {
-    "database": {"path": "wayback_import.db"},
+    "database": {
+        "path": "wayback_import.db",
+        "mmap_size": 268435456,
+        "cache_size_kib": 65536
+    },
     "wordpress": {
         "url": "https://your-site.com",
         "username": "admin",
@@ -20,6 +35,7 @@ DEFAULT_CONFIG = {
     },
     "wayback": {
         "rate_limit": 3,
+        "concurrency": 100,
         "retries": 5,
         "before_date": "20240801",
         "after_date": None,
@@ -46,9 +62,9 @@ DEFAULT_CONFIG = {
 }
 
 
-def create_config_file():
+def create_config_file(force=False):
     cfg_path = Path("config.json")
-    if cfg_path.exists():
+    if cfg_path.exists() and not force:
         try:
             overwrite = input("⚠️ ملف config.json موجود. هل تريد الكتابة فوقه؟ (y/n): ")
         except EOFError:
@@ -56,20 +72,31 @@ def create_config_file():
         if overwrite.lower() != 'y':
             print("❌ تم الإلغاء")
             return
-    with open(cfg_path, 'w', encoding='utf-8') as f:
-        json.dump(DEFAULT_CONFIG, f, indent=2, ensure_ascii=False)
+    if orjson:
+        cfg_path.write_bytes(orjson.dumps(DEFAULT_CONFIG, option=orjson.OPT_INDENT_2))
+    else:
+        with open(cfg_path, 'w', encoding='utf-8') as f:
+            json.dump(DEFAULT_CONFIG, f, indent=2, ensure_ascii=False)
     print(f"✅ تم إنشاء {cfg_path}")
     print("📝 عدّل الملف وأضف بيانات WordPress الخاصة بك")
 
 
+@lru_cache(maxsize=8)
+def _parse_config(config_path, mtime_ns):
+    raw = Path(config_path).read_bytes()
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def load_config(config_path="config.json"):
     p = Path(config_path)
     if not p.exists():
         print(f"❌ ملف {config_path} غير موجود")
         print("💡 استخدم: python run.py init لإنشائه")
         sys.exit(1)
-    with open(p, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    # mtime in the cache key means edits invalidate automatically
+    return _parse_config(config_path, p.stat().st_mtime_ns)
 
 
 def show_statistics(db_path):
@@ -80,22 +107,8 @@ def show_statistics(db_path):
     print("📊 إحصائيات المشروع")
     print("="*60)
 
-    stats = {}
-    cur = db.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status")
-    for status, count in cur.fetchall():
-        stats[f'urls_{status}'] = count
-
-    cur = db.conn.execute("SELECT COUNT(*) FROM articles")
-    stats['total_articles'] = cur.fetchone()[0]
-
-    cur = db.conn.execute("SELECT COUNT(*) FROM articles WHERE wp_post_id IS NOT NULL")
-    stats['published_articles'] = cur.fetchone()[0]
-
-    cur = db.conn.execute("SELECT COUNT(*) FROM assets")
-    stats['total_images'] = cur.fetchone()[0]
-
-    cur = db.conn.execute("SELECT COUNT(*) FROM assets WHERE uploaded = 1")
-    stats['uploaded_images'] = cur.fetchone()[0]
+    # Trigger-maintained counters: one small table read, no scans of urls/articles/assets
+    stats = db.get_stats_snapshot()
 
     print(f"""
 الروابط:
@@ -104,14 +117,14 @@ def show_statistics(db_path):
   • فاشلة:     {stats.get('urls_failed', 0)}
 
 المقالات:
-  • إجمالي:    {stats['total_articles']}
-  • منشورة:    {stats['published_articles']}
-  • متبقية:    {stats['total_articles'] - stats['published_articles']}
+  • إجمالي:    {stats.get('total_articles', 0)}
+  • منشورة:    {stats.get('published_articles', 0)}
+  • متبقية:    {stats.get('total_articles', 0) - stats.get('published_articles', 0)}
 
 الصور:
-  • إجمالي:    {stats['total_images']}
-  • مرفوعة:    {stats['uploaded_images']}
-  • متبقية:    {stats['total_images'] - stats['uploaded_images']}
+  • إجمالي:    {stats.get('total_images', 0)}
+  • مرفوعة:    {stats.get('uploaded_images', 0)}
+  • متبقية:    {stats.get('total_images', 0) - stats.get('uploaded_images', 0)}
     """)
 
     cur = db.conn.execute("""
@@ -128,7 +141,44 @@ def show_statistics(db_path):
     print("="*60 + "\n")
 
 
+def build_pipeline_config(config, batch=None):
+    return {
+        'db_path': config['database']['path'],
+        'db_mmap_size': config['database'].get('mmap_size', 268435456),
+        'db_cache_kib': config['database'].get('cache_size_kib', 65536),
+        'wp_url': config['wordpress']['url'],
+        'wp_user': config['wordpress']['username'],
+        'wp_password': config['wordpress']['app_password'],
+        'default_category_id': config['wordpress'].get('default_category_id', 1),
+        'batch_size': batch or config['processing']['batch_size'],
+        'rate_limit': config['wayback'].get('rate_limit', 3),
+        'concurrency': config['wayback'].get('concurrency', 100),
+        'before_date': config['wayback'].get('before_date'),
+        'after_date': config['wayback'].get('after_date'),
+        'user_agent': config['wayback'].get('user_agent', "Mozilla/5.0 (compatible; WaybackImporter/1.1)"),
+        'exclude_paths': config.get('filters', {}).get('exclude_paths'),
+    }
+
+
 def main():
+    if uvloop and sys.platform != 'win32':
+        import asyncio
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    # Fast path: flagless commands don't need the argparse machinery at all
+    if len(sys.argv) == 2 and sys.argv[1] in ('init', 'stats', 'fix-links'):
+        command = sys.argv[1]
+        if command == 'init':
+            create_config_file()
+            return
+        config = load_config()
+        if command == 'stats':
+            show_statistics(config['database']['path'])
+            return
+        from wayback_importer import ImportPipeline
+        ImportPipeline(build_pipeline_config(config)).run_link_fixing()
+        return
+
     parser = argparse.ArgumentParser(
         description="نظام استيراد مواقع من Wayback Machine إلى WordPress",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -153,32 +203,20 @@ def main():
     parser.add_argument('--limit', type=int, default=1000, help='عدد الروابط الأقصى')
     parser.add_argument('--batch', type=int, help='حجم الدفعة (يتجاوز الإعدادات)')
     parser.add_argument('--dry-run', action='store_true', help='محاكاة بدون تنفيذ فعلي')
+    parser.add_argument('--force', action='store_true', help='تخطي التأكيد (مثل الكتابة فوق config.json)')
 
     args = parser.parse_args()
 
     if args.command == 'init':
-        create_config_file()
+        create_config_file(force=args.force)
         return
 
     config = load_config(args.config)
 
     # Lazy import
-    from wayback_importer import ImportPipeline, Database
-
-    pipeline_config = {
-        'db_path': config['database']['path'],
-        'wp_url': config['wordpress']['url'],
-        'wp_user': config['wordpress']['username'],
-        'wp_password': config['wordpress']['app_password'],
-        'default_category_id': config['wordpress'].get('default_category_id', 1),
-        'batch_size': args.batch or config['processing']['batch_size'],
-        'rate_limit': config['wayback'].get('rate_limit', 3),
-        'before_date': config['wayback'].get('before_date'),
-        'after_date': config['wayback'].get('after_date'),
-        'user_agent': config['wayback'].get('user_agent', "Mozilla/5.0 (compatible; WaybackImporter/1.1)"),
-    }
+    from wayback_importer import ImportPipeline
 
-    pipeline = ImportPipeline(pipeline_config)
+    pipeline = ImportPipeline(build_pipeline_config(config, batch=args.batch))
 
     if args.command == 'discover':
         if not args.domain:
@@ -193,6 +231,7 @@ def main():
     elif args.command == 'publish':
         if args.dry_run:
             print("🧪 وضع المحاكاة - لن يتم النشر الفعلي")
+            from wayback_importer import Database
             db = Database(config['database']['path'])
             cur = db.conn.execute("SELECT COUNT(*) FROM articles WHERE wp_post_id IS NULL")
             count = cur.fetchone()[0]
@@ -2,13 +2,8 @@
 # streamlit_app.py
 # -*- coding: utf-8 -*-
 import streamlit as st
-import os
-import asyncio
 from pathlib import Path
 
-# Local imports
-from wayback_importer import ImportPipeline
-
 st.set_page_config(page_title="Wayback → WordPress Importer", page_icon="🗂️", layout="wide")
 
 st.title("🗂️ Wayback → WordPress Importer (Streamlit)")
@@ -43,16 +38,33 @@ def get_secret(section: str, key: str, default=None):
     except Exception:
         return default
 
-default_wp_url = get_secret("wordpress", "url", "")
-default_wp_user = get_secret("wordpress", "username", "")
-default_wp_pass = get_secret("wordpress", "app_password", "")
-default_cat_id = int(get_secret("wordpress", "default_category_id", 1))
+@st.cache_resource
+def secrets_snapshot():
+    """Read all secrets once per session instead of per key per rerun."""
+    return {
+        'wp_url': get_secret("wordpress", "url", ""),
+        'wp_user': get_secret("wordpress", "username", ""),
+        'wp_pass': get_secret("wordpress", "app_password", ""),
+        'cat_id': int(get_secret("wordpress", "default_category_id", 1)),
+        'db_path': get_secret("database", "path", "wayback_import.db"),
+        'rate': int(get_secret("wayback", "rate_limit", 3)),
+        'concurrency': int(get_secret("wayback", "concurrency", 100)),
+        'before': get_secret("wayback", "before_date", "20240801"),
+        'after': get_secret("wayback", "after_date", None),
+        'ua': get_secret("wayback", "user_agent", "Mozilla/5.0 (compatible; WaybackImporter/1.1)"),
+    }
+
+_secrets = secrets_snapshot()
+default_wp_url = _secrets['wp_url']
+default_wp_user = _secrets['wp_user']
+default_wp_pass = _secrets['wp_pass']
+default_cat_id = _secrets['cat_id']
 
-default_db_path = get_secret("database", "path", "wayback_import.db")
-default_rate = int(get_secret("wayback", "rate_limit", 3))
-default_before = get_secret("wayback", "before_date", "20240801")
-default_after = get_secret("wayback", "after_date", None)
-default_ua = get_secret("wayback", "user_agent", "Mozilla/5.0 (compatible; WaybackImporter/1.1)")
+default_db_path = _secrets['db_path']
+default_rate = _secrets['rate']
+default_before = _secrets['before']
+default_after = _secrets['after']
+default_ua = _secrets['ua']
 
 with st.sidebar:
     st.header("⚙️ الإعدادات")
@@ -71,12 +83,24 @@ with st.sidebar:
     st.markdown("---")
     batch_size = st.number_input("Batch size", min_value=10, max_value=500, value=150, step=10)
 
+# ---- Cached DB access (the script reruns top-to-bottom on every interaction) ----
+@st.cache_resource
+def get_db(path: str):
+    from wayback_importer import Database
+    return Database(path)
+
+@st.cache_data(ttl=5)
+def get_stats(path: str):
+    # Trigger-maintained counters: a single small-table read, no scans
+    return get_db(path).get_stats_snapshot()
+
 # Inputs
 domain = st.text_input("🕸️ النطاق المراد استيراده (مثال: example.com)", value="", placeholder="example.com")
 limit = st.number_input("الحد الأقصى لعدد الروابط (Discovery Limit)", min_value=50, max_value=20000, value=500, step=50)
 
 # Initialize pipeline (lazy)
 def build_pipeline():
+    from wayback_importer import ImportPipeline
     cfg = {
         'db_path': db_path,
         'wp_url': wp_url.strip(),
@@ -85,19 +109,37 @@ def build_pipeline():
         'default_category_id': int(default_category_id),
         'batch_size': int(batch_size),
         'rate_limit': int(rate_limit),
+        'concurrency': _secrets['concurrency'],
         'before_date': before_date.strip() or None,
         'after_date': (after_date or "").strip() or None,
         'user_agent': ua.strip()
     }
     return ImportPipeline(cfg)
 
-def run_async(coro):
+# ---- Background worker: long pipeline runs must not block the script thread ----
+@st.cache_resource
+def get_executor():
+    import concurrent.futures
+    return concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+def _run_coro(coro):
+    import asyncio
     try:
-        return asyncio.run(coro)
-    except RuntimeError:
-        # In case an event loop is already running
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(coro)
+        import sys
+        if sys.platform != 'win32':
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except Exception:
+        pass
+    return asyncio.run(coro)
+
+def submit_job(label, fn):
+    job = st.session_state.get('job')
+    if job and not job.done():
+        st.warning("⏳ هناك عملية قيد التنفيذ بالفعل — انتظر اكتمالها.")
+        return
+    st.session_state['job_label'] = label
+    st.session_state['job'] = get_executor().submit(fn)
 
 col1, col2, col3, col4, col5 = st.columns(5)
 run_full = col1.button("🚀 Run Full Pipeline", use_container_width=True, type="primary", disabled=not domain)
@@ -106,76 +148,65 @@ btn_fetch = col3.button("📥 Fetch", use_container_width=True)
 btn_publish = col4.button("📝 Publish", use_container_width=True)
 btn_fix = col5.button("🔗 Fix Links", use_container_width=True)
 
-log_area = st.empty()
-
-def status_log(msg):
-    with log_area.container():
-        st.write(msg)
-
 if run_full:
     if not (wp_url and wp_user and wp_pass):
         st.error("أدخل إعدادات WordPress الصحيحة من الشريط الجانبي أو عبر Secrets.")
     else:
         pipe = build_pipeline()
-        with st.status("تشغيل العملية الكاملة...", expanded=True) as status:
-            st.write("🔍 اكتشاف الروابط...")
-            pipe.run_discovery(domain, limit=int(limit))
-
-            st.write("📥 جلب ومعالجة المحتوى...")
-            run_async(pipe.run_fetching())
-
-            st.write("📝 النشر على WordPress...")
-            pipe.run_publishing()
-
-            st.write("🔗 إصلاح الروابط الداخلية...")
-            pipe.run_link_fixing()
-
-            status.update(label="✅ اكتملت العملية بنجاح", state="complete")
+        submit_job("العملية الكاملة", lambda: _run_coro(pipe.run_full_async(domain, limit=int(limit))))
 
 if btn_discover:
     pipe = build_pipeline()
-    with st.spinner("اكتشاف الروابط..."):
-        pipe.run_discovery(domain, limit=int(limit))
-    st.success("تم الاكتشاف. استخدم Fetch للمتابعة.")
+    submit_job("اكتشاف الروابط", lambda: pipe.run_discovery(domain, limit=int(limit)))
 
 if btn_fetch:
     pipe = build_pipeline()
-    with st.spinner("جلب ومعالجة المحتوى..."):
-        run_async(pipe.run_fetching())
-    st.success("تم الجلب والمعالجة.")
+    submit_job("جلب ومعالجة المحتوى", lambda: _run_coro(pipe.run_fetching()))
 
 if btn_publish:
     if not (wp_url and wp_user and wp_pass):
         st.error("أدخل إعدادات WordPress الصحيحة أولًا.")
     else:
         pipe = build_pipeline()
-        with st.spinner("النشر على WordPress..."):
-            pipe.run_publishing()
-        st.success("اكتمل النشر.")
+        submit_job("النشر على WordPress", pipe.run_publishing)
 
 if btn_fix:
     pipe = build_pipeline()
-    with st.spinner("إصلاح الروابط الداخلية..."):
-        pipe.run_link_fixing()
-    st.success("تم إصلاح الروابط.")
+    submit_job("إصلاح الروابط الداخلية", pipe.run_link_fixing)
+
+@st.fragment(run_every=1.0)
+def job_status():
+    job = st.session_state.get('job')
+    if not job:
+        return
+    label = st.session_state.get('job_label', '')
+    if job.done():
+        err = job.exception()
+        if err:
+            st.error(f"❌ فشلت العملية ({label}): {err}")
+        else:
+            st.success(f"✅ اكتملت العملية: {label}")
+        # Report once, then forget the job — otherwise this fragment keeps
+        # clearing the stats cache every second forever
+        st.session_state.pop('job', None)
+        st.session_state.pop('job_label', None)
+        get_stats.clear()
+    else:
+        st.info(f"⏳ قيد التنفيذ: {label} ...")
+
+job_status()
 
 st.markdown("---")
 st.subheader("📊 إحصائيات سريعة")
 if Path(db_path).exists():
-    from wayback_importer import Database
-    db = Database(db_path)
-    cur = db.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status")
-    rows = cur.fetchall()
+    stats = get_stats(db_path)
+    total_articles = stats.get('total_articles', 0)
+    published_articles = stats.get('published_articles', 0)
     cols = st.columns(3)
-    status_map = dict(rows)
-    cols[0].metric("Pending URLs", status_map.get('pending', 0))
-    cols[1].metric("Fetched URLs", status_map.get('fetched', 0))
-    cols[2].metric("Failed URLs", status_map.get('failed', 0))
-
-    cur = db.conn.execute("SELECT COUNT(*) FROM articles")
-    total_articles = cur.fetchone()[0]
-    cur = db.conn.execute("SELECT COUNT(*) FROM articles WHERE wp_post_id IS NOT NULL")
-    published_articles = cur.fetchone()[0]
+    cols[0].metric("Pending URLs", stats.get('urls_pending', 0))
+    cols[1].metric("Fetched URLs", stats.get('urls_fetched', 0))
+    cols[2].metric("Failed URLs", stats.get('urls_failed', 0))
+
     st.metric("Published Articles", published_articles, delta=published_articles - 0)
     st.caption(f"Total Articles in DB: {total_articles}")
 else:
@@ -19,10 +19,12 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
 import sqlite3
 import json
+import threading
 import time
 import re
 from typing import List, Dict, Optional, Tuple
@@ -39,22 +41,87 @@ try:
 except Exception:
     trafilatura = None
 
+# Preconfigure trafilatura once: disabling the signal-based extraction timeout
+# avoids per-call setup and makes extraction safe from worker threads.
+_TRAFILATURA_CONFIG = None
+if trafilatura:
+    try:
+        from trafilatura.settings import use_config
+        _TRAFILATURA_CONFIG = use_config()
+        _TRAFILATURA_CONFIG.set('DEFAULT', 'EXTRACTION_TIMEOUT', '0')
+    except Exception:
+        _TRAFILATURA_CONFIG = None
+
 try:
     from dateutil import parser as dateparser
 except Exception:
     dateparser = None
 
+try:
+    import ahocorasick  # pyahocorasick, for DFA-based multi-pattern matching
+except Exception:
+    ahocorasick = None
+
+try:
+    from aiolimiter import AsyncLimiter
+except Exception:
+    AsyncLimiter = None
+
+# Prefer the C-based lxml parser for BeautifulSoup; fall back to the stdlib one
+try:
+    import lxml  # noqa: F401
+    BS_PARSER = 'lxml'
+except Exception:
+    BS_PARSER = 'html.parser'
+
+# selectolax (Lexbor) for the flat attribute-walk passes; BS4 stays the fallback
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except Exception:
+    LexborHTMLParser = None
+
 
 # ============================== Utils ======================================
 
+# Compiled once: these run per image / per link / per article in the hot paths
+_WB_TS_RE = re.compile(r'/web/(\d+)[^/]+/')
+_WB_SNAPSHOT_RE = re.compile(r'(https?://web\.archive\.org/web/)(\d+)[^/]+/(.*)')
+_WB_BASE_RE = re.compile(r'(https?://web\.archive\.org/web/\d+)[^/]+/(.*)')
+_WB_ID_RE = re.compile(r'/web/(\d+)id_/')
+_MULTI_SLASH_RE = re.compile(r'//+')
+_DATE_CLASS_RE = re.compile('date|publish', re.I)
+_CONTENT_CLASS_RE = re.compile('content|post|article', re.I)
+# Wayback wraps its injected toolbar in stable comment markers, and its replay
+# scripts all load from archive.org — both strippable before any parsing
+_WB_TOOLBAR_RE = re.compile(r'<!--\s*BEGIN WAYBACK TOOLBAR INSERT.*?END WAYBACK TOOLBAR INSERT\s*-->', re.S)
+_WB_ARCHIVE_SCRIPT_RE = re.compile(r'<script[^>]*src="[^"]*archive\.org[^"]*"[^>]*>\s*</script>', re.I)
+
+
+# Only advertise brotli when a decoder is importable — requests/urllib3 and
+# aiohttp silently need brotli (or brotlicffi) to decompress 'br' bodies.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except Exception:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "br, gzip, deflate"
+    except Exception:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
 def make_requests_session(ua: str) -> requests.Session:
     s = requests.Session()
     s.headers.update(
-        {"User-Agent": ua or "Mozilla/5.0 (compatible; WaybackImporter/1.1)", "Accept-Encoding": "gzip, deflate"}
+        {"User-Agent": ua or "Mozilla/5.0 (compatible; WaybackImporter/1.1)", "Accept-Encoding": ACCEPT_ENCODING}
     )
     retries = Retry(total=5, backoff_factor=1.2, status_forcelist=[429, 500, 502, 503, 504])
-    s.mount('http://', HTTPAdapter(max_retries=retries))
-    s.mount('https://', HTTPAdapter(max_retries=retries))
+    # A wider pool keeps one warm TCP+TLS connection per concurrent caller
+    # (image uploads, publisher, link fixer all hit the same one or two hosts)
+    # instead of re-handshaking once the default pool of 10 is exhausted
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=10, pool_maxsize=32)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
     return s
 
 
@@ -69,31 +136,126 @@ def wayback_image_url(snapshot_url: str, img_src: str) -> str:
 
     # If image is already from Wayback: force im_
     if 'web.archive.org' in img_src:
-        return re.sub(r'/web/(\d+)[^/]+/', r'/web/\1im_/', img_src)
+        return _WB_TS_RE.sub(r'/web/\1im_/', img_src)
 
     # If the image is relative to the snapshot page
-    m = re.match(r'(https?://web\.archive\.org/web/)(\d+)[^/]+/(.*)', snapshot_url)
+    m = _WB_SNAPSHOT_RE.match(snapshot_url)
     if m:
         ts = m.group(2)
         # Make absolute based on the original page url (group 3 is the original url, but we can use the snapshot base)
         # Build a base that ends after "timestampid_/"
-        base = re.sub(r'(https?://web\.archive\.org/web/\d+)[^/]+/(.*)', r'\1id_/', snapshot_url)
+        base = _WB_BASE_RE.sub(r'\1id_/', snapshot_url)
         abs_src = urljoin(base, img_src)
         # Replace id_ with im_
-        abs_src = re.sub(r'/web/(\d+)id_/', r'/web/\1im_/', abs_src)
+        abs_src = _WB_ID_RE.sub(r'/web/\1im_/', abs_src)
         return abs_src
 
     return img_src
 
 
+@lru_cache(maxsize=100_000)
 def normalize_url(host_or_url: str) -> Tuple[str, str]:
-    """Return (host, path) normalized for consistent internal link matching."""
-    pu = urlparse(host_or_url)
-    host = pu.netloc.lower().lstrip('www.')
-    path = re.sub(r'//+', '/', pu.path.rstrip('/'))
+    """Return (host, path) normalized for consistent internal link matching.
+
+    Called once per <a href> during link fixing, so it's memoized and takes a
+    str.partition fast path for plain http(s) URLs instead of urlparse.
+    """
+    if host_or_url.startswith(('http://', 'https://')):
+        _, _, rest = host_or_url.partition('://')
+        # Strip query/fragment before the host/path split, or a pathless URL
+        # like https://example.com?x=1 would keep them inside the host
+        rest = rest.partition('#')[0].partition('?')[0]
+        netloc, slash, path = rest.partition('/')
+        path = slash + path
+    else:
+        pu = urlparse(host_or_url)
+        netloc, path = pu.netloc, pu.path
+    host = netloc.lower()
+    # Not lstrip('www.') — that strips any run of 'w'/'.' chars and would
+    # mangle hosts like wow.example.com
+    if host.startswith('www.'):
+        host = host[4:]
+    path = _MULTI_SLASH_RE.sub('/', path.rstrip('/'))
     return host, path
 
 
+DEFAULT_EXCLUDE_PATHS = ['/wp-admin/', '/feed/', '/tag/', '/author/', '.xml', '.json']
+
+
+def compile_exclude_matcher(paths):
+    """Compile exclude-path substrings into one matcher instead of N `in` checks per URL."""
+    paths = [p for p in (paths or DEFAULT_EXCLUDE_PATHS) if p]
+    if not paths:
+        return lambda s: False
+    if ahocorasick:
+        automaton = ahocorasick.Automaton()
+        for p in paths:
+            automaton.add_word(p, p)
+        automaton.make_automaton()
+        return lambda s: next(automaton.iter(s), None) is not None
+    search = re.compile('|'.join(re.escape(p) for p in paths)).search
+    return lambda s: search(s) is not None
+
+
+def lexbor_inner_html(tree) -> str:
+    """Serialize a Lexbor tree back to the content fragment (without the <body> wrapper)."""
+    body = tree.body
+    if body is None:
+        return tree.html or ''
+    html = body.html or ''
+    if html.startswith('<body>') and html.endswith('</body>'):
+        html = html[len('<body>'):-len('</body>')]
+    return html
+
+
+def soup_inner_html(soup) -> str:
+    """Serialize a BS4 fragment parse without the <html><body> wrapper.
+
+    lxml wraps fragments in a full document on re-serialization;
+    html.parser leaves them bare, so fall through to str() when no body."""
+    if soup.body is not None:
+        return soup.body.decode_contents()
+    return str(soup)
+
+
+class TokenBucketLimiter:
+    """Minimal stand-in for aiolimiter.AsyncLimiter(rate, 1).
+
+    Acquiring waits for a token but releases immediately, so requests can
+    overlap up to the in-flight cap while entry stays at `rate` per second.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._allowance = float(rate)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._allowance = min(
+                    float(self.rate),
+                    self._allowance + (now - self._last) * (self.rate / self.period),
+                )
+                self._last = now
+                if self._allowance >= 1:
+                    self._allowance -= 1
+                    return self
+                await asyncio.sleep((1 - self._allowance) * self.period / self.rate)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def chunked(seq, size):
+    """Yield successive slices of `seq` at most `size` items long."""
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
 def to_iso_utc(dt_str: Optional[str]) -> str:
     if not dt_str:
         return datetime.now(timezone.utc).isoformat()
@@ -110,15 +272,44 @@ def to_iso_utc(dt_str: Optional[str]) -> str:
 
 # ============================== Database ===================================
 
+# RETURNING needs SQLite >= 3.35 (2021); older builds fall back to lastrowid
+_SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
 class Database:
-    def __init__(self, db_path="wayback_import.db"):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._tune()
+    # Keep at most this many log rows; older ones are pruned on insert
+    LOG_RING_SIZE = 100_000
+
+    def __init__(self, db_path="wayback_import.db", mmap_size=268_435_456, cache_size_kib=65_536):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self._local = threading.local()
         self.init_tables()
 
-    def _tune(self):
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self.conn.execute("PRAGMA synchronous=NORMAL;")
+    @property
+    def conn(self):
+        # One connection per thread: a single shared connection serializes all
+        # access on its internal lock, and WAL only allows reads concurrent
+        # with a write when the readers sit on their own connections.
+        c = getattr(self._local, 'conn', None)
+        if c is None:
+            c = sqlite3.connect(self.db_path)
+            self._tune(c)
+            self._local.conn = c
+        return c
+
+    def _tune(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        # With a connection per thread, two threads may write concurrently —
+        # wait for the writer lock instead of failing with 'database is locked'
+        conn.execute("PRAGMA busy_timeout=30000;")
+        # In-memory temp structures, mmap'd reads and a larger page cache cut
+        # read amplification on the LinkFixer scans and the url-mapping JOIN
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)};")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)};")
 
     def init_tables(self):
         cur = self.conn.cursor()
@@ -177,22 +368,132 @@ class Database:
             )
         """)
 
+        # Ring buffer: long imports would otherwise grow logs without bound
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_logs_ring AFTER INSERT ON logs BEGIN
+                DELETE FROM logs WHERE id <= NEW.id - {self.LOG_RING_SIZE};
+            END
+        """)
+
+        # Counters maintained by triggers so stats never scan the big tables
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS stats_snapshot (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cur.executescript("""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_urls_ins AFTER INSERT ON urls BEGIN
+                INSERT INTO stats_snapshot(key, value) VALUES ('urls_' || NEW.status, 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_urls_upd AFTER UPDATE OF status ON urls
+            WHEN OLD.status <> NEW.status BEGIN
+                UPDATE stats_snapshot SET value = value - 1 WHERE key = 'urls_' || OLD.status;
+                INSERT INTO stats_snapshot(key, value) VALUES ('urls_' || NEW.status, 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_urls_del AFTER DELETE ON urls BEGIN
+                UPDATE stats_snapshot SET value = value - 1 WHERE key = 'urls_' || OLD.status;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_stats_articles_ins AFTER INSERT ON articles BEGIN
+                INSERT INTO stats_snapshot(key, value) VALUES ('total_articles', 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+                INSERT INTO stats_snapshot(key, value)
+                SELECT 'published_articles', 1 WHERE NEW.wp_post_id IS NOT NULL
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_articles_upd AFTER UPDATE OF wp_post_id ON articles
+            WHEN (OLD.wp_post_id IS NULL) <> (NEW.wp_post_id IS NULL) BEGIN
+                INSERT INTO stats_snapshot(key, value)
+                VALUES ('published_articles', CASE WHEN NEW.wp_post_id IS NULL THEN -1 ELSE 1 END)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = value + CASE WHEN NEW.wp_post_id IS NULL THEN -1 ELSE 1 END;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_articles_del AFTER DELETE ON articles BEGIN
+                UPDATE stats_snapshot SET value = value - 1 WHERE key = 'total_articles';
+                UPDATE stats_snapshot SET value = value - 1
+                WHERE key = 'published_articles' AND OLD.wp_post_id IS NOT NULL;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_stats_assets_ins AFTER INSERT ON assets BEGIN
+                INSERT INTO stats_snapshot(key, value) VALUES ('total_images', 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+                INSERT INTO stats_snapshot(key, value)
+                SELECT 'uploaded_images', 1 WHERE NEW.uploaded = 1
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_assets_upd AFTER UPDATE OF uploaded ON assets
+            WHEN OLD.uploaded <> NEW.uploaded BEGIN
+                INSERT INTO stats_snapshot(key, value)
+                VALUES ('uploaded_images', CASE WHEN NEW.uploaded = 1 THEN 1 ELSE -1 END)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = value + CASE WHEN NEW.uploaded = 1 THEN 1 ELSE -1 END;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_stats_assets_del AFTER DELETE ON assets BEGIN
+                UPDATE stats_snapshot SET value = value - 1 WHERE key = 'total_images';
+                UPDATE stats_snapshot SET value = value - 1
+                WHERE key = 'uploaded_images' AND OLD.uploaded = 1;
+            END;
+        """)
+
         # Indexes
         cur.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_articles_wp ON articles(wp_post_id)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_assets_article_uploaded ON assets(article_id, uploaded)")
+        # Stats queries filter on uploaded alone, and the error log panel
+        # does WHERE level = ? ORDER BY id DESC LIMIT n
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_assets_uploaded ON assets(uploaded)")
+        # Media-reuse lookup: same image URL across articles (logos, avatars)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_assets_url ON assets(original_url)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_level_id ON logs(level, id DESC)")
 
         self.conn.commit()
+        self.refresh_stats_snapshot()
 
-    def add_url(self, original_url, snapshot_url, timestamp):
-        try:
+    def refresh_stats_snapshot(self):
+        """Rebuild the counters from the source tables (recovers missed events)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM stats_snapshot")
             self.conn.execute("""
-                INSERT INTO urls (original_url, snapshot_url, timestamp, discovered_at)
-                VALUES (?, ?, ?, ?)
-            """, (original_url, snapshot_url, timestamp, datetime.now().isoformat()))
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            pass
+                INSERT INTO stats_snapshot (key, value)
+                SELECT 'urls_' || status, COUNT(*) FROM urls GROUP BY status
+            """)
+            self.conn.execute("""
+                INSERT INTO stats_snapshot (key, value)
+                SELECT 'total_articles', COUNT(*) FROM articles
+                UNION ALL
+                SELECT 'published_articles', COUNT(*) FROM articles WHERE wp_post_id IS NOT NULL
+                UNION ALL
+                SELECT 'total_images', COUNT(*) FROM assets
+                UNION ALL
+                SELECT 'uploaded_images', COUNT(*) FROM assets WHERE uploaded = 1
+            """)
+
+    def get_stats_snapshot(self) -> Dict[str, int]:
+        cur = self.conn.execute("SELECT key, value FROM stats_snapshot")
+        return {key: value for key, value in cur.fetchall()}
+
+    def add_url(self, original_url, snapshot_url, timestamp):
+        self.conn.execute("""
+            INSERT OR IGNORE INTO urls (original_url, snapshot_url, timestamp, discovered_at)
+            VALUES (?, ?, ?, ?)
+        """, (original_url, snapshot_url, timestamp, datetime.now().isoformat()))
+        self.conn.commit()
+
+    def add_urls_bulk(self, rows):
+        """Bulk insert (original_url, snapshot_url, timestamp, discovered_at) rows.
+
+        One transaction per chunk instead of one commit per URL; duplicates
+        are skipped the same way add_url's IntegrityError handling did.
+        """
+        for chunk in chunked(rows, 10_000):
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT OR IGNORE INTO urls (original_url, snapshot_url, timestamp, discovered_at)
+                    VALUES (?, ?, ?, ?)
+                """, chunk)
 
     def get_pending_urls(self, limit=100):
         cur = self.conn.execute("""
@@ -212,12 +513,20 @@ class Database:
         self.conn.commit()
 
     def save_article(self, url_id, data):
+        # No commit here: callers batch the article + its assets in one transaction
+        params = (url_id, data['title'], data['content'], data['excerpt'],
+                  data['pub_date'], data['category'], ','.join(data.get('tags', [])))
+        if _SQLITE_HAS_RETURNING:
+            cur = self.conn.execute("""
+                INSERT INTO articles (url_id, title, content, excerpt, pub_date, category, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                RETURNING id
+            """, params)
+            return cur.fetchone()[0]
         cur = self.conn.execute("""
             INSERT INTO articles (url_id, title, content, excerpt, pub_date, category, tags)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (url_id, data['title'], data['content'], data['excerpt'],
-              data['pub_date'], data['category'], ','.join(data.get('tags', []))))
-        self.conn.commit()
+        """, params)
         return cur.lastrowid
 
     def get_url_mapping(self):
@@ -242,11 +551,13 @@ class Database:
 class WaybackDiscovery:
     CDX_API = "https://web.archive.org/cdx/search/cdx"
 
-    def __init__(self, db: Database, ua: str, after_date: Optional[str] = None, before_date: Optional[str] = None):
+    def __init__(self, db: Database, ua: str, after_date: Optional[str] = None, before_date: Optional[str] = None,
+                 exclude_paths: Optional[List[str]] = None):
         self.db = db
         self.ua = ua
         self.after_date = after_date
         self.before_date = before_date
+        self.is_excluded = compile_exclude_matcher(exclude_paths)
         self.session = make_requests_session(self.ua)
 
     def discover_urls(self, domain: str, limit: int = 1000) -> int:
@@ -258,6 +569,9 @@ class WaybackDiscovery:
             ('filter', 'mimetype:text/html'),
             ('collapse', 'urlkey'),
             ('collapse', 'digest'),
+            # Only the two columns we consume — CDX returns 7 by default and
+            # the payload (and json parse) shrinks proportionally
+            ('fl', 'original,timestamp'),
             ('limit', str(limit)),
             ('output', 'json'),
         ]
@@ -275,20 +589,33 @@ class WaybackDiscovery:
         headers = data[0] if data else []
         rows = data[1:] if len(data) > 1 else []
 
-        discovered = 0
+        try:
+            idx_original = headers.index('original')
+            idx_timestamp = headers.index('timestamp')
+        except ValueError:
+            self.db.log('error', 'CDX response missing original/timestamp columns')
+            return 0
+
+        now_iso = datetime.now().isoformat()
+        to_insert = []
+        seen = set()
         for row in rows:
-            item = dict(zip(headers, row))
-            original_url = item.get('original', '')
-            timestamp = item.get('timestamp', '')
+            original_url = row[idx_original]
+            timestamp = row[idx_timestamp]
 
-            # Simple filtering
-            low = original_url.lower()
-            if any(x in low for x in ['/wp-admin/', '/feed/', '/tag/', '/author/', '.xml', '.json']):
+            # Dedupe in-batch (CDX collapse is per-page, repeats can slip through)
+            if original_url in seen:
+                continue
+            seen.add(original_url)
+
+            if self.is_excluded(original_url.lower()):
                 continue
 
             snapshot_url = f"https://web.archive.org/web/{timestamp}id_/{original_url}"
-            self.db.add_url(original_url, snapshot_url, timestamp)
-            discovered += 1
+            to_insert.append((original_url, snapshot_url, timestamp, now_iso))
+
+        self.db.add_urls_bulk(to_insert)
+        discovered = len(to_insert)
 
         self.db.log('info', f'Discovered {discovered} URLs from {domain}')
         return discovered
@@ -297,18 +624,42 @@ class WaybackDiscovery:
 # ============================== Fetcher ====================================
 
 class WaybackFetcher:
-    def __init__(self, db: Database, ua: str, rate_limit=3, max_retries=5):
+    def __init__(self, db: Database, ua: str, rate_limit=3, max_retries=5, concurrency=100):
         self.db = db
         self.rate_limit = rate_limit
-        self.semaphore = asyncio.Semaphore(rate_limit)
+        # Token bucket paces request *starts* at rate_limit/s; the semaphore
+        # only caps how many requests are in flight at once, so slow responses
+        # overlap instead of serializing behind a per-request sleep.
+        if AsyncLimiter is not None:
+            self.limiter = AsyncLimiter(max(1, rate_limit), 1)
+        else:
+            self.limiter = TokenBucketLimiter(max(1, rate_limit))
+        self.semaphore = asyncio.Semaphore(concurrency)
         self.ua = ua
         self.max_retries = max_retries
+        self.concurrency = concurrency
+
+    def make_session(self) -> aiohttp.ClientSession:
+        """One pooled session per fetch run: bounded connector + DNS cache."""
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.concurrency,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            headers={"User-Agent": self.ua, "Accept-Encoding": ACCEPT_ENCODING},
+            timeout=aiohttp.ClientTimeout(total=60),
+            connector=connector,
+        )
 
     async def fetch_page(self, session, url_id, snapshot_url):
         async with self.semaphore:
             for attempt in range(1, self.max_retries + 1):
                 try:
-                    await asyncio.sleep(1 / max(1, self.rate_limit))
+                    # Acquiring a token only gates the start; nothing is held
+                    # for the duration of the request.
+                    async with self.limiter:
+                        pass
                     async with session.get(snapshot_url, timeout=30) as resp:
                         if resp.status in (429, 500, 502, 503, 504):
                             await asyncio.sleep(2 ** attempt)
@@ -329,9 +680,7 @@ class WaybackFetcher:
             return None
 
     async def fetch_batch(self, urls_batch):
-        headers = {"User-Agent": self.ua, "Accept-Encoding": "gzip, deflate"}
-        timeout = aiohttp.ClientTimeout(total=60)
-        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+        async with self.make_session() as session:
             tasks = [self.fetch_page(session, uid, url) for uid, _, url in urls_batch]
             results = await asyncio.gather(*tasks)
             return list(zip([u[0] for u in urls_batch], results))
@@ -344,12 +693,18 @@ class ContentProcessor:
         self.db = db
 
     def clean_wayback_artifacts(self, html):
-        soup = BeautifulSoup(html, 'html.parser')
-        # Remove Wayback toolbar/scripts
-        for elem in soup.find_all(['div', 'script', 'style']):
-            _id = elem.get('id', '') or ''
-            if isinstance(_id, str) and _id.lower().startswith('wm-'):
-                elem.decompose()
+        # Regex pre-strip on the raw HTML: the toolbar block and archive.org
+        # replay scripts never reach the parser
+        html = _WB_TOOLBAR_RE.sub('', html)
+        html = _WB_ARCHIVE_SCRIPT_RE.sub('', html)
+        soup = BeautifulSoup(html, BS_PARSER)
+        # Older snapshots predate the comment markers — only then scan for
+        # leftover wm-* elements (cheap substring check first)
+        if 'wm-' in html:
+            for elem in soup.find_all(['div', 'script', 'style']):
+                _id = elem.get('id', '') or ''
+                if isinstance(_id, str) and _id.lower().startswith('wm-'):
+                    elem.decompose()
         # Remove common trackers
         for script in soup.find_all('script'):
             st = (script.string or '')[:300].lower()
@@ -364,7 +719,7 @@ class ContentProcessor:
 
         # Date
         pub_date = None
-        date_elem = soup.find('time') or soup.find(class_=re.compile('date|publish', re.I))
+        date_elem = soup.find('time') or soup.find(class_=_DATE_CLASS_RE)
         if date_elem:
             pub_date = date_elem.get('datetime') or date_elem.get_text(strip=True)
         pub_date_iso = to_iso_utc(pub_date)
@@ -386,54 +741,70 @@ class ContentProcessor:
             'tags': []
         }
 
-    def extract_content(self, html, base_url):
+    def extract_content(self, soup, base_url):
         if trafilatura:
             try:
-                out = trafilatura.extract(html, include_images=False, favor_recall=True, url=base_url, output='html')
-                if out and len(out) > 100:
-                    return out
+                # Parse once with load_html and hand trafilatura the tree, so
+                # it doesn't re-run its own HTML parsing inside extract()
+                tree = trafilatura.load_html(str(soup))
+                if tree is not None:
+                    kwargs = {}
+                    if _TRAFILATURA_CONFIG is not None:
+                        kwargs['config'] = _TRAFILATURA_CONFIG
+                    out = trafilatura.extract(
+                        tree, include_images=False, favor_recall=True,
+                        url=base_url, output='html', **kwargs)
+                    if out and len(out) > 100:
+                        return out
             except Exception:
                 pass
-        # fallback
-        soup = BeautifulSoup(html, 'html.parser')
-        main = soup.find('article') or soup.find('main') or soup.find(class_=re.compile('content|post|article', re.I)) or soup.find('body')
+        # fallback: reuse the already-cleaned soup instead of reparsing
+        main = soup.find('article') or soup.find('main') or soup.find(class_=_CONTENT_CLASS_RE) or soup.find('body')
         if not main:
             return "<p>فشل استخراج المحتوى</p>"
         for elem in main.find_all(['script', 'style', 'nav', 'aside', 'footer']):
             elem.decompose()
         return str(main)
 
-    def extract_images(self, content_html, snapshot_url):
-        soup = BeautifulSoup(content_html, 'html.parser')
+    def absolutize_and_collect_images(self, content_html, snapshot_url):
+        """One parse over the content: absolutize href/src against the snapshot
+        base (id_) and collect the image records in the same walk."""
+        base = _WB_BASE_RE.sub(r'\1id_/', snapshot_url)
         images = []
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            if not src or src.startswith('data:'):
-                continue
-            # force wayback image
-            arch_src = wayback_image_url(snapshot_url, src)
+
+        def record_image(src, alt):
             images.append({
-                'url': arch_src,
-                'alt': img.get('alt', '') or '',
+                'url': wayback_image_url(snapshot_url, src),
+                'alt': alt or '',
                 'original_src_in_html': src,
             })
-        return images
 
-    def absolutize_links(self, content_html, snapshot_url):
-        """Make links absolute relative to snapshot base (id_)."""
-        soup = BeautifulSoup(content_html, 'html.parser')
-        base = re.sub(r'(https?://web\.archive\.org/web/\d+)[^/]+/(.*)', r'\1id_/', snapshot_url)
+        if LexborHTMLParser:
+            tree = LexborHTMLParser(content_html)
+            for tag in tree.css('a, img'):
+                attr = 'href' if tag.tag == 'a' else 'src'
+                v = tag.attributes.get(attr)
+                if not v or v.startswith('data:'):
+                    continue
+                if not urlparse(v).scheme:
+                    v = urljoin(base, v)
+                    tag.attrs[attr] = v
+                if tag.tag == 'img':
+                    record_image(v, tag.attributes.get('alt'))
+            return lexbor_inner_html(tree), images
+
+        soup = BeautifulSoup(content_html, BS_PARSER)
         for tag in soup.find_all(['a', 'img']):
             attr = 'href' if tag.name == 'a' else 'src'
             v = tag.get(attr)
-            if not v:
-                continue
-            if v.startswith('data:'):
+            if not v or v.startswith('data:'):
                 continue
-            # keep absolute as is, else join
             if not urlparse(v).scheme:
-                tag[attr] = urljoin(base, v)
-        return str(soup)
+                v = urljoin(base, v)
+                tag[attr] = v
+            if tag.name == 'img':
+                record_image(v, tag.get('alt', ''))
+        return soup_inner_html(soup), images
 
     def process_page(self, url_id, html, original_url, snapshot_url):
         if not html:
@@ -441,24 +812,22 @@ class ContentProcessor:
 
         soup = self.clean_wayback_artifacts(html)
         metadata = self.extract_metadata(soup, original_url)
-        content_raw = self.extract_content(str(soup), original_url)
-        content_abs = self.absolutize_links(content_raw, snapshot_url)
-        images = self.extract_images(content_abs, snapshot_url)
+        content_raw = self.extract_content(soup, original_url)
+        content_abs, images = self.absolutize_and_collect_images(content_raw, snapshot_url)
 
         data = {
             **metadata,
             'content': content_abs,
             'images': images
         }
-        article_id = self.db.save_article(url_id, data)
 
-        # save images records
-        for img in images:
-            self.db.conn.execute("""
+        # One transaction (and one fsync) per article + its asset records
+        with self.db.conn:
+            article_id = self.db.save_article(url_id, data)
+            self.db.conn.executemany("""
                 INSERT INTO assets (article_id, original_url, alt_text)
                 VALUES (?, ?, ?)
-            """, (article_id, img['url'], img['alt']))
-        self.db.conn.commit()
+            """, [(article_id, img['url'], img['alt']) for img in images])
 
         return article_id
 
@@ -466,29 +835,38 @@ class ContentProcessor:
 # ============================ WordPress Publisher ==========================
 
 class WordPressPublisher:
+    # Cap parallel media uploads so we don't trip WP rate limits
+    UPLOAD_CONCURRENCY = 4
+
     def __init__(self, site_url, username, app_password, db: Database, ua: str, default_category_id: int = 1):
         self.site_url = site_url.rstrip('/')
         self.auth = (username, app_password)
         self.db = db
+        self.ua = ua
         self.default_category_id = default_category_id
         self.session = make_requests_session(ua)
 
     def upload_image(self, image_url, alt_text: str = '') -> Optional[Dict]:
         try:
-            # Download image (from Wayback preferably im_)
-            img_resp = self.session.get(image_url, timeout=30)
-            if img_resp.status_code != 200 or not img_resp.content:
-                return None
-
-            filename = Path(urlparse(image_url).path).name or 'image.jpg'
-            files = {'file': (filename, img_resp.content, img_resp.headers.get('content-type', 'image/jpeg'))}
-
-            upload_resp = self.session.post(
-                f"{self.site_url}/wp-json/wp/v2/media",
-                auth=self.auth,
-                files=files,
-                timeout=60
-            )
+            # Download image (from Wayback preferably im_); stream=True lets
+            # us bail on a bad status before pulling the body, but the body
+            # itself is read fully — requests buffers the multipart anyway
+            with self.session.get(image_url, stream=True, timeout=30) as img_resp:
+                if img_resp.status_code != 200:
+                    return None
+                content = img_resp.content
+                if not content:
+                    return None
+
+                filename = Path(urlparse(image_url).path).name or 'image.jpg'
+                files = {'file': (filename, content, img_resp.headers.get('content-type', 'image/jpeg'))}
+
+                upload_resp = self.session.post(
+                    f"{self.site_url}/wp-json/wp/v2/media",
+                    auth=self.auth,
+                    files=files,
+                    timeout=60
+                )
             if upload_resp.status_code == 201:
                 media_data = upload_resp.json()
                 media_id = media_data['id']
@@ -505,6 +883,79 @@ class WordPressPublisher:
             self.db.log('error', f'Image upload failed: {image_url}', {'error': str(e)})
         return None
 
+    async def _upload_image_async(self, session, sem, image_url, alt_text=''):
+        """Async twin of upload_image; one semaphore slot per in-flight upload."""
+        # Credentials go only to wp-json endpoints — never on the image
+        # download, which hits web.archive.org or arbitrary third-party hosts
+        wp_auth = aiohttp.BasicAuth(*self.auth)
+        async with sem:
+            try:
+                async with session.get(image_url, timeout=aiohttp.ClientTimeout(total=30)) as img_resp:
+                    if img_resp.status != 200:
+                        return None
+                    content = await img_resp.read()
+                    if not content:
+                        return None
+                    content_type = img_resp.headers.get('content-type', 'image/jpeg')
+
+                filename = Path(urlparse(image_url).path).name or 'image.jpg'
+                form = aiohttp.FormData()
+                form.add_field('file', content, filename=filename, content_type=content_type)
+
+                async with session.post(
+                    f"{self.site_url}/wp-json/wp/v2/media",
+                    auth=wp_auth,
+                    data=form,
+                    timeout=aiohttp.ClientTimeout(total=60),
+                ) as upload_resp:
+                    if upload_resp.status != 201:
+                        return None
+                    media_data = await upload_resp.json()
+
+                media_id = media_data['id']
+                if alt_text:
+                    async with session.post(
+                        f"{self.site_url}/wp-json/wp/v2/media/{media_id}",
+                        auth=wp_auth,
+                        json={"alt_text": alt_text},
+                        timeout=aiohttp.ClientTimeout(total=30),
+                    ):
+                        pass
+                return {'id': media_id, 'url': media_data.get('source_url')}
+            except Exception as e:
+                self.db.log('error', f'Image upload failed: {image_url}', {'error': str(e)})
+                return None
+
+    async def _upload_images_async(self, assets):
+        """Upload (asset_id, url, alt) rows concurrently; returns {asset_id: media}."""
+        sem = asyncio.Semaphore(self.UPLOAD_CONCURRENCY)
+        # No session-level auth: aiohttp would attach it to every request,
+        # including the image downloads from external hosts
+        async with aiohttp.ClientSession(
+            headers={"User-Agent": self.ua},
+        ) as session:
+            results = await asyncio.gather(*(
+                self._upload_image_async(session, sem, img_url, alt_text or '')
+                for _, img_url, alt_text in assets
+            ))
+        return {asset_id: media
+                for (asset_id, _, _), media in zip(assets, results) if media}
+
+    def upload_images(self, assets):
+        """Sync wrapper used by publish_article; falls back to serial uploads
+        if we're somehow already inside a running event loop."""
+        if not assets:
+            return {}
+        try:
+            return asyncio.run(self._upload_images_async(assets))
+        except RuntimeError:
+            media_by_asset = {}
+            for asset_id, img_url, alt_text in assets:
+                media = self.upload_image(img_url, alt_text=alt_text or '')
+                if media:
+                    media_by_asset[asset_id] = media
+            return media_by_asset
+
     def publish_article(self, article_id):
         cur = self.db.conn.execute("""
             SELECT url_id, title, content, excerpt, pub_date, category
@@ -522,29 +973,55 @@ class WordPressPublisher:
             WHERE article_id = ? AND uploaded = 0
         """, (article_id,)).fetchall()
 
-        soup = BeautifulSoup(content, 'html.parser')
         featured_media_id = None
 
-        for asset_id, img_url, alt_text in assets:
-            media = self.upload_image(img_url, alt_text=alt_text or '')
-            if media:
-                # update DB
-                self.db.conn.execute("""
-                    UPDATE assets SET wp_media_id = ?, wp_url = ?, uploaded = 1
-                    WHERE id = ?
-                """, (media['id'], media['url'], asset_id))
-                # replace in HTML
-                for img in soup.find_all('img'):
-                    src = img.get('src', '')
-                    if src and img_url in src:
-                        img['src'] = media['url']
-                        if alt_text:
-                            img['alt'] = alt_text
-                if not featured_media_id:
-                    featured_media_id = media['id']
-
-        self.db.conn.commit()
-        updated_content = str(soup)
+        if not assets:
+            # Nothing to replace — don't pay for a parse/serialize round-trip
+            updated_content = content
+        else:
+            # Reuse media already uploaded for the same source URL (logos,
+            # avatars and other repeats) instead of a download+upload round-trip
+            media_by_asset = {}
+            to_upload = []
+            for asset_id, img_url, alt_text in assets:
+                prior = self.db.conn.execute("""
+                    SELECT wp_media_id, wp_url FROM assets
+                    WHERE original_url = ? AND wp_media_id IS NOT NULL LIMIT 1
+                """, (img_url,)).fetchone()
+                if prior:
+                    media_by_asset[asset_id] = {'id': prior[0], 'url': prior[1]}
+                else:
+                    to_upload.append((asset_id, img_url, alt_text))
+            media_by_asset.update(self.upload_images(to_upload))
+
+            soup = BeautifulSoup(content, BS_PARSER)
+            # Index imgs once instead of find_all per asset
+            imgs_by_src = {}
+            for img in soup.find_all('img'):
+                src = img.get('src', '')
+                if src:
+                    imgs_by_src.setdefault(src, []).append(img)
+
+            for asset_id, img_url, alt_text in assets:
+                media = media_by_asset.get(asset_id)
+                if media:
+                    # update DB
+                    self.db.conn.execute("""
+                        UPDATE assets SET wp_media_id = ?, wp_url = ?, uploaded = 1
+                        WHERE id = ?
+                    """, (media['id'], media['url'], asset_id))
+                    # replace in HTML
+                    for src, imgs in imgs_by_src.items():
+                        if img_url in src:
+                            for img in imgs:
+                                img['src'] = media['url']
+                                if alt_text:
+                                    img['alt'] = alt_text
+                    if not featured_media_id:
+                        featured_media_id = media['id']
+
+            self.db.conn.commit()
+            updated_content = soup_inner_html(soup)
 
         # prepare slug from original url path
         url_row = self.db.conn.execute("SELECT original_url FROM urls WHERE id = ?", (url_id,)).fetchone()
@@ -593,35 +1070,80 @@ class LinkFixer:
         self.db = db
         self.wp = wp_publisher
 
+    def _build_link_pattern(self, url_map):
+        """Compile one href-anchored alternation over every spelling of every
+        old URL (scheme, www, trailing slash), longest variant first."""
+        variant_map = {}
+        for old_url, permalink in url_map.items():
+            pu = urlparse(old_url)
+            host = pu.netloc.lower()
+            hosts = {host, host[4:] if host.startswith('www.') else 'www.' + host}
+            path = pu.path.rstrip('/')
+            paths = {path, path + '/'} if path else {'', '/'}
+            for h in hosts:
+                for p in paths:
+                    for scheme in ('https://', 'http://', '//'):
+                        variant_map.setdefault(scheme + h + p, permalink)
+        alternation = '|'.join(
+            re.escape(v) for v in sorted(variant_map, key=len, reverse=True))
+        # Our stored content is serialized by BS4/Lexbor, so hrefs are always
+        # double-quoted; trailing query/fragment is dropped like before
+        pattern = re.compile(r'href="(' + alternation + r')(?:[?#][^"]*)?"')
+        return pattern, variant_map
+
     def fix_internal_links(self):
         url_map = self.db.get_url_mapping()
 
-        cur = self.db.conn.execute("""
+        # Normalize the URL map once; it is identical for every article
+        norm_map = {normalize_url(old_url): new_permalink
+                    for old_url, new_permalink in url_map.items()}
+        pattern, variant_map = self._build_link_pattern(url_map) if url_map else (None, {})
+        # Cheap pre-filter for the tree fallback: does the article even
+        # mention one of the mapped hosts (any casing)?
+        hosts_re = re.compile('|'.join(
+            re.escape(urlparse(u).netloc) for u in url_map), re.I) if url_map else None
+
+        # Materialize rows up front so the cursor isn't held across WP POSTs
+        rows = self.db.conn.execute("""
             SELECT id, wp_post_id, content
             FROM articles
             WHERE wp_post_id IS NOT NULL
-        """)
-
-        fixed_count = 0
-        for article_id, post_id, content in cur.fetchall():
-            soup = BeautifulSoup(content, 'html.parser')
-            updated = False
-
-            # Build normalized map for speed
-            norm_map = {}
-            for old_url, new_permalink in url_map.items():
-                norm_map[normalize_url(old_url)] = new_permalink
-
-            for link in soup.find_all('a', href=True):
-                host, path = normalize_url(link['href'])
-                key = (host, path)
-                if key in norm_map:
-                    if link['href'] != norm_map[key]:
-                        link['href'] = norm_map[key]
+        """).fetchall()
+
+        updates = []
+        for article_id, post_id, content in (rows if pattern is not None else []):
+            # Fast path: pure string scan in the C regex engine, no parse
+            new_content, n = pattern.subn(
+                lambda m: 'href="%s"' % variant_map[m.group(1)], content)
+            updated = n > 0
+            if not updated and not hosts_re.search(content):
+                # No mapped host appears at all — nothing a tree walk could find
+                continue
+            # Tree fallback only for spellings the alternation can't express
+            # (odd casing, doubled slashes) in articles that mention a host
+            if not updated and LexborHTMLParser:
+                tree = LexborHTMLParser(content)
+                for link in tree.css('a'):
+                    href = link.attributes.get('href')
+                    if not href:
+                        continue
+                    new_href = norm_map.get(normalize_url(href))
+                    if new_href and href != new_href:
+                        link.attrs['href'] = new_href
                         updated = True
+                new_content = lexbor_inner_html(tree) if updated else content
+            elif not updated:
+                soup = BeautifulSoup(content, BS_PARSER)
+                for link in soup.find_all('a', href=True):
+                    host, path = normalize_url(link['href'])
+                    key = (host, path)
+                    if key in norm_map:
+                        if link['href'] != norm_map[key]:
+                            link['href'] = norm_map[key]
+                            updated = True
+                new_content = soup_inner_html(soup) if updated else content
 
             if updated:
-                new_content = str(soup)
                 r = self.wp.session.post(
                     f"{self.wp.site_url}/wp-json/wp/v2/posts/{post_id}",
                     auth=self.wp.auth,
@@ -629,10 +1151,16 @@ class LinkFixer:
                     timeout=60
                 )
                 if r.status_code == 200:
-                    self.db.conn.execute("UPDATE articles SET content = ? WHERE id = ?", (new_content, article_id))
-                    fixed_count += 1
+                    updates.append((new_content, article_id))
+
+        # One executemany + commit for all successfully pushed articles
+        if updates:
+            with self.db.conn:
+                self.db.conn.executemany(
+                    "UPDATE articles SET content = ? WHERE id = ?", updates
+                )
 
-        self.db.conn.commit()
+        fixed_count = len(updates)
         print(f"🔗 تم إصلاح الروابط في {fixed_count} مقال")
         return fixed_count
 
@@ -641,15 +1169,26 @@ class LinkFixer:
 
 class ImportPipeline:
     def __init__(self, config):
-        self.db = Database(config.get('db_path', 'wayback_import.db'))
+        self.db = Database(
+            config.get('db_path', 'wayback_import.db'),
+            mmap_size=config.get('db_mmap_size', 268_435_456),
+            cache_size_kib=config.get('db_cache_kib', 65_536),
+        )
         self.ua = config.get('user_agent', "Mozilla/5.0 (compatible; WaybackImporter/1.1)")
         self.discovery = WaybackDiscovery(
             self.db,
             ua=self.ua,
             after_date=config.get('after_date'),
             before_date=config.get('before_date'),
+            exclude_paths=config.get('exclude_paths'),
+        )
+        self.fetcher = WaybackFetcher(
+            self.db,
+            ua=self.ua,
+            rate_limit=config.get('rate_limit', 3),
+            max_retries=5,
+            concurrency=config.get('concurrency', 100),
         )
-        self.fetcher = WaybackFetcher(self.db, ua=self.ua, rate_limit=config.get('rate_limit', 3), max_retries=5)
         self.processor = ContentProcessor(self.db)
         self.wp = WordPressPublisher(
             config['wp_url'],
@@ -682,11 +1221,11 @@ class ImportPipeline:
         print(f"📥 جلب {len(pending)} صفحة...")
         results = await self.fetcher.fetch_batch(pending)
 
+        pending_by_id = {row[0]: row for row in pending}
         processed = 0
         for url_id, html in results:
             if html:
-                original_url = next((u[1] for u in pending if u[0] == url_id), '')
-                snapshot_url = next((u[2] for u in pending if u[0] == url_id), '')
+                _, original_url, snapshot_url = pending_by_id[url_id]
                 self.processor.process_page(url_id, html, original_url, snapshot_url)
                 processed += 1
 
@@ -722,16 +1261,84 @@ class ImportPipeline:
         print("="*60)
         self.link_fixer.fix_internal_links()
 
-    def run_full_pipeline(self, domain, limit=1000):
+    async def _fetch_into_queue(self, article_queue: asyncio.Queue, queued: set):
+        """Fetch pending pages and enqueue processed article ids as they arrive."""
+        pending = self.db.get_pending_urls(self.batch_size)
+        if not pending:
+            print("⚠️ لا توجد روابط معلقة")
+            return 0
+
+        print(f"📥 جلب {len(pending)} صفحة...")
+
+        processed = 0
+        async with self.fetcher.make_session() as session:
+            async def fetch_one(url_id, original_url, snapshot_url):
+                nonlocal processed
+                html = await self.fetcher.fetch_page(session, url_id, snapshot_url)
+                if not html:
+                    return
+                article_id = self.processor.process_page(url_id, html, original_url, snapshot_url)
+                if article_id:
+                    processed += 1
+                    queued.add(article_id)
+                    await article_queue.put(article_id)
+
+            await asyncio.gather(*(fetch_one(*row) for row in pending))
+
+        print(f"✅ تمت معالجة {processed} مقال")
+        return processed
+
+    async def _publish_from_queue(self, article_queue: asyncio.Queue):
+        """Consume article ids and publish them; a None sentinel stops the worker."""
+        published = 0
+        while True:
+            article_id = await article_queue.get()
+            if article_id is None:
+                break
+            # WP publishing is sync requests; run it off-loop so fetching keeps going
+            if await asyncio.to_thread(self.wp.publish_article, article_id):
+                published += 1
+            await asyncio.sleep(0.5)  # respect server load
+        return published
+
+    async def run_full_async(self, domain, limit=1000):
+        """Full pipeline with fetching and publishing overlapped.
+
+        Discovery must finish before fetching (it fills the urls table), and
+        link fixing needs the final permalinks, but fetching and publishing
+        are both I/O-bound and run concurrently through an asyncio.Queue.
+        """
         print("\n🚀 بدء عملية الاستيراد الكاملة")
         print(f"الموقع: {domain}")
         print(f"الحد الأقصى: {limit} رابط\n")
 
-        self.run_discovery(domain, limit)
-        asyncio.run(self.run_fetching())
-        self.run_publishing()
-        self.run_link_fixing()
+        await asyncio.to_thread(self.run_discovery, domain, limit)
+
+        article_queue: asyncio.Queue = asyncio.Queue()
+        queued: set = set()
+        publisher = asyncio.create_task(self._publish_from_queue(article_queue))
+
+        await self._fetch_into_queue(article_queue, queued)
+
+        # Articles left over from previous runs that this fetch didn't touch
+        cur = self.db.conn.execute("""
+            SELECT id FROM articles
+            WHERE wp_post_id IS NULL
+            LIMIT ?
+        """, (self.batch_size,))
+        for (article_id,) in cur.fetchall():
+            if article_id not in queued:
+                await article_queue.put(article_id)
+
+        await article_queue.put(None)
+        published = await publisher
+        print(f"✅ تم نشر {published} مقال")
+
+        await asyncio.to_thread(self.run_link_fixing)
 
         print("\n" + "="*60)
         print("✅ اكتملت العملية بنجاح!")
         print("="*60)
+
+    def run_full_pipeline(self, domain, limit=1000):
+        asyncio.run(self.run_full_async(domain, limit))